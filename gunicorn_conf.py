@@ -0,0 +1,27 @@
+# Production server settings: gunicorn -c gunicorn_conf.py main:app
+import asyncio
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+# Each worker has its own event loop and its own DB connection pool
+# (see database.py), so size the database for workers * pool size.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Picks up uvloop and httptools automatically when installed (uvicorn[standard]).
+worker_class = "uvicorn_worker.UvicornWorker"
+# Import the app once in the master so the encryption key and the cached
+# dashboard page are loaded before forking.
+preload_app = True
+
+def on_starting(server):
+    # Create tables and demo data once, before the workers fork, so they don't
+    # race to insert the same rows. Connections are closed again so none are
+    # shared with the children.
+    from database import engine
+    from main import init_db
+
+    async def _init():
+        await init_db()
+        await engine.dispose()
+
+    asyncio.run(_init())
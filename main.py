@@ -1,13 +1,21 @@
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session as DBSession
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import exists, func, insert, lambda_stmt, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
 from typing import List
 from pathlib import Path
 from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import shutil
 
-from database import Base, engine, get_db
+import orjson
+
+from database import engine, get_db, SessionLocal, create_schema
 from models import Therapist, Lead, Session
 from schemas import (
     TherapistCreate,
@@ -20,19 +28,42 @@ from schemas import (
 )
 from security import encrypt_text
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 BASE_DIR = Path(__file__).resolve().parent
 UPLOAD_DIR = BASE_DIR / "uploads"
 FRONTEND_DIR = BASE_DIR / "frontend"
 UPLOAD_DIR.mkdir(exist_ok=True)
 FRONTEND_DIR.mkdir(exist_ok=True)
 
+# Uploads are copied to disk in chunks of this size rather than read whole.
+# The destination file uses a write buffer of the same size, so each chunk
+# becomes a single write syscall instead of many 8 KB ones.
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+# List endpoints fetch and write out rows in batches of this size.
+STREAM_BATCH_SIZE = 500
+
+# For demo, every "/me" endpoint acts as the therapist with this id.
+CURRENT_THERAPIST_ID = 1
+
+async def init_db():
+    # Create database tables
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    # Create the demo therapist and sample data once, so request handlers
+    # never have to look it up or seed it.
+    async with SessionLocal() as db:
+        await ensure_demo_therapist(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    yield
+    await engine.dispose()
+
 app = FastAPI(
     title="Therapist Practice Management API",
     version="1.0.0",
     description="APIs to help therapists manage profiles, leads, sessions, and earnings.",
+    lifespan=lifespan,
 )
 
 # CORS (if you later serve frontend separately)
@@ -47,79 +78,151 @@ app.add_middleware(
 # Serve static frontend
 app.mount("/app", StaticFiles(directory=str(FRONTEND_DIR), html=True), name="frontend")
 
+# The dashboard shell is small and static: read it once instead of on every hit.
+INDEX_FILE = FRONTEND_DIR / "index.html"
+INDEX_HTML = INDEX_FILE.read_bytes() if INDEX_FILE.exists() else None
+
 @app.get("/", include_in_schema=False)
-def root():
-    index_file = FRONTEND_DIR / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
+async def root():
+    if INDEX_HTML is not None:
+        return Response(
+            content=INDEX_HTML,
+            media_type="text/html",
+            headers={"Cache-Control": "public, max-age=300"},
+        )
     return {"message": "Therapist API running"}
 
-# Helper: get "current therapist". For demo, always therapist with id=1.
-def get_current_therapist(db: DBSession) -> Therapist:
-    therapist = db.query(Therapist).filter(Therapist.id == 1).first()
+# Helper: get "current therapist" id. Authentication is mocked, so this is
+# always the demo therapist created at startup.
+def get_current_therapist_id() -> int:
+    return CURRENT_THERAPIST_ID
+
+async def get_current_therapist(db: AsyncSession) -> Therapist:
+    therapist = await db.get(Therapist, get_current_therapist_id())
+    if not therapist:
+        raise HTTPException(status_code=404, detail="Therapist not found")
+    return therapist
+
+async def ensure_demo_therapist(db: AsyncSession):
+    therapist = await db.get(Therapist, CURRENT_THERAPIST_ID)
     if not therapist:
         therapist = Therapist(
-            id=1,
+            id=CURRENT_THERAPIST_ID,
             full_name="Demo Therapist",
             email="therapist@example.com",
             specialization="General",
             bio="This is a demo therapist profile.",
         )
         db.add(therapist)
-        db.commit()
-        db.refresh(therapist)
+        await db.commit()
         # also seed some leads & sessions
-        seed_sample_data(db, therapist.id)
-    return therapist
+        await seed_sample_data(db, therapist.id)
 
-def seed_sample_data(db: DBSession, therapist_id: int):
+async def seed_sample_data(db: AsyncSession, therapist_id: int):
     # Only seed if none exist
-    if db.query(Lead).filter(Lead.therapist_id == therapist_id).count() == 0:
-        leads = [
-            Lead(
-                therapist_id=therapist_id,
-                patient_name="Alice",
-                issue="Anxiety & stress",
-                price=20.0,
-                purchased=False,
-            ),
-            Lead(
-                therapist_id=therapist_id,
-                patient_name="Bob",
-                issue="Work burnout",
-                price=25.0,
-                purchased=False,
-            ),
-        ]
-        db.add_all(leads)
-
-    if db.query(Session).filter(Session.therapist_id == therapist_id).count() == 0:
+    has_leads = await db.scalar(
+        select(exists().where(Lead.therapist_id == therapist_id))
+    )
+    if not has_leads:
+        # Plain multi-row INSERTs: no ORM instances to track for seed rows.
+        await db.execute(
+            insert(Lead),
+            [
+                {
+                    "therapist_id": therapist_id,
+                    "patient_name": "Alice",
+                    "issue": "Anxiety & stress",
+                    "price": 20.0,
+                    "purchased": False,
+                },
+                {
+                    "therapist_id": therapist_id,
+                    "patient_name": "Bob",
+                    "issue": "Work burnout",
+                    "price": 25.0,
+                    "purchased": False,
+                },
+            ],
+        )
+
+    has_sessions = await db.scalar(
+        select(exists().where(Session.therapist_id == therapist_id))
+    )
+    if not has_sessions:
         now = datetime.utcnow()
-        sessions = [
-            Session(
-                therapist_id=therapist_id,
-                patient_name="Charlie",
-                scheduled_for=now + timedelta(days=1),
-                status="scheduled",
-                fee=100.0,
-            ),
-            Session(
-                therapist_id=therapist_id,
-                patient_name="Dana",
-                scheduled_for=now - timedelta(days=1),
-                status="completed",
-                fee=120.0,
-            ),
-        ]
-        db.add_all(sessions)
-    db.commit()
+        await db.execute(
+            insert(Session),
+            [
+                {
+                    "therapist_id": therapist_id,
+                    "patient_name": "Charlie",
+                    "scheduled_for": now + timedelta(days=1),
+                    "status": "scheduled",
+                    "fee": 100.0,
+                },
+                {
+                    "therapist_id": therapist_id,
+                    "patient_name": "Dana",
+                    "scheduled_for": now - timedelta(days=1),
+                    "status": "completed",
+                    "fee": 120.0,
+                },
+            ],
+        )
+    await db.commit()
+
+async def stream_json_array(rows):
+    # Emit a JSON array one batch of rows at a time, so a long listing is
+    # never held in memory as a whole. The rows come from the request's
+    # get_db session, which FastAPI (>=0.118) keeps open until the response
+    # has been fully sent.
+    yield b"["
+    first = True
+    async for batch in rows.partitions():
+        # OPT_UTC_Z writes UTC datetimes as "...Z", matching Pydantic's output.
+        chunk = b",".join(
+            orjson.dumps(dict(row), option=orjson.OPT_UTC_Z) for row in batch
+        )
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+def etag_response(request: Request, model: BaseModel) -> Response:
+    # Strong ETag over the exact response body. A client that already has
+    # this version gets an empty 304 instead of the same JSON again;
+    # "no-cache" makes browsers revalidate rather than reuse it blindly.
+    body = model.model_dump_json().encode("utf-8")
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    client_tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    # "*" matches any current representation, and these resources always exist.
+    if if_none_match.strip() == "*" or etag in client_tags:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def save_upload(src, dest: Path):
+    with dest.open("wb", buffering=UPLOAD_CHUNK_SIZE) as f:
+        shutil.copyfileobj(src, f, length=UPLOAD_CHUNK_SIZE)
 
 # --------- API ENDPOINTS ---------
+# Hot queries are wrapped in lambda_stmt: SQLAlchemy builds the statement and
+# its SQL once per lambda and afterwards only binds the captured variables
+# (therapist_id, lead_id) on each call.
+# Endpoints with a response_model return ORM objects as-is: FastAPI validates
+# them once (from_attributes) in pydantic-core and serializes the result
+# straight to JSON bytes, so there is no separate encode pass to skip. The
+# list endpoints instead stream their rows (see stream_json_array); their
+# response_model only documents the shape.
 
 # 1. Create therapist profile
 @app.post("/api/v1/therapists/profile", response_model=TherapistOut)
-def create_therapist_profile(payload: TherapistCreate, db: DBSession = Depends(get_db)):
-    therapist = db.query(Therapist).filter(Therapist.email == payload.email).first()
+async def create_therapist_profile(
+    payload: TherapistCreate, db: AsyncSession = Depends(get_db)
+):
+    therapist = await db.scalar(
+        select(Therapist).where(Therapist.email == payload.email)
+    )
     if therapist:
         # Update existing
         therapist.full_name = payload.full_name
@@ -133,30 +236,27 @@ def create_therapist_profile(payload: TherapistCreate, db: DBSession = Depends(g
             bio=payload.bio,
         )
         db.add(therapist)
-    db.commit()
-    db.refresh(therapist)
+    await db.commit()
+    await db.refresh(therapist)
     return therapist
 
 # 2. Get current therapist profile
 @app.get("/api/v1/therapists/me/profile", response_model=TherapistOut)
-def get_my_profile(db: DBSession = Depends(get_db)):
-    therapist = get_current_therapist(db)
-    return therapist
+async def get_my_profile(request: Request, db: AsyncSession = Depends(get_db)):
+    therapist = await get_current_therapist(db)
+    return etag_response(request, TherapistOut.model_validate(therapist))
 
 # 3. Upload therapist documents ("S3" simulated as local uploads folder)
 @app.post("/api/v1/therapists/me/documents")
-async def upload_document(
-    file: UploadFile = File(...), db: DBSession = Depends(get_db)
-):
-    therapist = get_current_therapist(db)
+async def upload_document(file: UploadFile = File(...)):
+    therapist_id = get_current_therapist_id()
     # Store file under uploads/therapist_<id>/
-    therapist_dir = UPLOAD_DIR / f"therapist_{therapist.id}"
+    therapist_dir = UPLOAD_DIR / f"therapist_{therapist_id}"
     therapist_dir.mkdir(exist_ok=True)
     dest = therapist_dir / file.filename
 
-    with dest.open("wb") as f:
-        content = await file.read()
-        f.write(content)
+    # Stream to disk in a worker thread so large files never sit in memory.
+    await asyncio.to_thread(save_upload, file.file, dest)
 
     # In real life we'd upload to S3 and store the URL
     return {
@@ -167,112 +267,144 @@ async def upload_document(
 
 # 4. List leads
 @app.get("/api/v1/therapists/me/leads", response_model=List[LeadOut])
-def list_leads(db: DBSession = Depends(get_db)):
-    therapist = get_current_therapist(db)
-    leads = (
-        db.query(Lead)
-        .filter(Lead.therapist_id == therapist.id)
-        .order_by(Lead.created_at.desc())
-        .all()
+async def list_leads(db: AsyncSession = Depends(get_db)):
+    therapist_id = get_current_therapist_id()
+    # Select just the LeadOut columns: plain rows, no ORM entities to build.
+    stmt = lambda_stmt(
+        lambda: select(
+            Lead.id,
+            Lead.patient_name,
+            Lead.issue,
+            Lead.price,
+            Lead.purchased,
+            Lead.created_at,
+        )
+        .where(Lead.therapist_id == therapist_id)
+        # server-side timestamps have 1s resolution; id breaks ties
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+    )
+    result = await db.stream(stmt, execution_options={"yield_per": STREAM_BATCH_SIZE})
+    return StreamingResponse(
+        stream_json_array(result.mappings()), media_type="application/json"
     )
-    return leads
 
 # 5. Purchase a lead
 @app.post("/api/v1/therapists/me/leads/{lead_id}/purchase")
-def purchase_lead(lead_id: int, db: DBSession = Depends(get_db)):
-    therapist = get_current_therapist(db)
-    lead = (
-        db.query(Lead)
-        .filter(Lead.therapist_id == therapist.id, Lead.id == lead_id)
-        .first()
+async def purchase_lead(lead_id: int, db: AsyncSession = Depends(get_db)):
+    therapist_id = get_current_therapist_id()
+    # Flip the flag in one conditional UPDATE; no row comes back if the lead
+    # doesn't exist or was already purchased.
+    stmt = lambda_stmt(
+        lambda: update(Lead)
+        .where(
+            Lead.therapist_id == therapist_id,
+            Lead.id == lead_id,
+            Lead.purchased.is_not(True),
+        )
+        .values(purchased=True)
+        .returning(Lead.id)
     )
-    if not lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
-    if lead.purchased:
+    purchased_id = await db.scalar(stmt)
+    await db.commit()
+    if purchased_id is None:
+        lead_exists = await db.scalar(
+            select(
+                exists().where(Lead.therapist_id == therapist_id, Lead.id == lead_id)
+            )
+        )
+        if not lead_exists:
+            raise HTTPException(status_code=404, detail="Lead not found")
         return {"message": "Lead already purchased"}
 
-    lead.purchased = True
-    db.commit()
-    return {"message": "Lead purchased successfully", "lead_id": lead.id}
+    return {"message": "Lead purchased successfully", "lead_id": purchased_id}
 
 # 6. List sessions
 @app.get("/api/v1/therapists/me/sessions", response_model=List[SessionOut])
-def list_sessions(db: DBSession = Depends(get_db)):
-    therapist = get_current_therapist(db)
-    sessions = (
-        db.query(Session)
-        .filter(Session.therapist_id == therapist.id)
+async def list_sessions(db: AsyncSession = Depends(get_db)):
+    therapist_id = get_current_therapist_id()
+    # Select just the SessionOut columns; in particular never pull the
+    # encrypted notes into a listing.
+    stmt = lambda_stmt(
+        lambda: select(
+            Session.id,
+            Session.patient_name,
+            Session.scheduled_for,
+            Session.status,
+            Session.fee,
+        )
+        .where(Session.therapist_id == therapist_id)
         .order_by(Session.scheduled_for.desc())
-        .all()
     )
-    return sessions
+    result = await db.stream(stmt, execution_options={"yield_per": STREAM_BATCH_SIZE})
+    return StreamingResponse(
+        stream_json_array(result.mappings()), media_type="application/json"
+    )
 
 # 7. Update a session (status/fee)
 @app.patch("/api/v1/therapists/me/sessions/{session_id}", response_model=SessionOut)
-def update_session(
-    session_id: int, payload: SessionUpdate, db: DBSession = Depends(get_db)
+async def update_session(
+    session_id: int, payload: SessionUpdate, db: AsyncSession = Depends(get_db)
 ):
-    therapist = get_current_therapist(db)
-    session = (
-        db.query(Session)
-        .filter(Session.therapist_id == therapist.id, Session.id == session_id)
-        .first()
-    )
+    therapist_id = get_current_therapist_id()
+    session_filter = (Session.therapist_id == therapist_id, Session.id == session_id)
+    values = payload.model_dump(exclude_none=True)
+    if values:
+        # One UPDATE ... RETURNING gives back the updated row.
+        session = await db.scalar(
+            update(Session).where(*session_filter).values(**values).returning(Session)
+        )
+        await db.commit()
+    else:
+        session = await db.scalar(select(Session).where(*session_filter))
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-
-    if payload.status is not None:
-        session.status = payload.status
-    if payload.fee is not None:
-        session.fee = payload.fee
-
-    db.commit()
-    db.refresh(session)
     return session
 
 # 8. Add encrypted session notes
 @app.post("/api/v1/therapists/me/sessions/{session_id}/notes")
-def add_session_notes(
-    session_id: int, payload: SessionNotesCreate, db: DBSession = Depends(get_db)
+async def add_session_notes(
+    session_id: int, payload: SessionNotesCreate, db: AsyncSession = Depends(get_db)
 ):
-    therapist = get_current_therapist(db)
-    session = (
-        db.query(Session)
-        .filter(Session.therapist_id == therapist.id, Session.id == session_id)
-        .first()
+    therapist_id = get_current_therapist_id()
+    # Encryption is CPU work; keep it off the event loop.
+    notes_encrypted = await asyncio.to_thread(encrypt_text, payload.notes)
+    updated_id = await db.scalar(
+        update(Session)
+        .where(Session.therapist_id == therapist_id, Session.id == session_id)
+        .values(notes_encrypted=notes_encrypted)
+        .returning(Session.id)
     )
-    if not session:
+    await db.commit()
+    if updated_id is None:
         raise HTTPException(status_code=404, detail="Session not found")
-
-    session.notes_encrypted = encrypt_text(payload.notes)
-    db.commit()
     return {"message": "Session notes stored in encrypted form"}
 
 # 9. Earnings summary
 @app.get("/api/v1/therapists/me/earnings", response_model=EarningsSummary)
-def get_earnings(db: DBSession = Depends(get_db)):
-    therapist = get_current_therapist(db)
+async def get_earnings(request: Request, db: AsyncSession = Depends(get_db)):
+    therapist_id = get_current_therapist_id()
 
-    sessions = (
-        db.query(Session)
-        .filter(Session.therapist_id == therapist.id, Session.status == "completed")
-        .all()
-    )
-    from_sessions = sum(s.fee for s in sessions)
-
-    leads = (
-        db.query(Lead)
-        .filter(Lead.therapist_id == therapist.id, Lead.purchased == True)
-        .all()
+    # Let the database do the summing; both totals come back in one round trip.
+    stmt = lambda_stmt(
+        lambda: select(
+            select(func.coalesce(func.sum(Session.fee), 0.0))
+            .where(Session.therapist_id == therapist_id, Session.status == "completed")
+            .scalar_subquery(),
+            select(func.coalesce(func.sum(Lead.price), 0.0))
+            .where(Lead.therapist_id == therapist_id, Lead.purchased == True)
+            .scalar_subquery(),
+        )
     )
-    spent_on_leads = sum(l.price for l in leads)
+    result = await db.execute(stmt)
+    from_sessions, spent_on_leads = result.one()
 
     total_earnings = from_sessions
     net_earnings = total_earnings - spent_on_leads
 
-    return EarningsSummary(
+    summary = EarningsSummary(
         total_earnings=total_earnings,
         from_sessions=from_sessions,
         spent_on_leads=spent_on_leads,
         net_earnings=net_earnings,
     )
+    return etag_response(request, summary)
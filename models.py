@@ -1,42 +1,61 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text, Index, func
 from sqlalchemy.orm import relationship
-from datetime import datetime
 
 from database import Base
 
 class Therapist(Base):
     __tablename__ = "therapists"
 
-    id = Column(Integer, primary_key=True, index=True)
-    full_name = Column(String, nullable=False)
-    email = Column(String, unique=True, index=True, nullable=False)
-    specialization = Column(String, nullable=True)
+    id = Column(Integer, primary_key=True)
+    full_name = Column(String(120), nullable=False)
+    email = Column(String(254), unique=True, index=True, nullable=False)
+    specialization = Column(String(120), nullable=True)
     bio = Column(Text, nullable=True)
 
-    leads = relationship("Lead", back_populates="therapist")
-    sessions = relationship("Session", back_populates="therapist")
+    # lazy="raise": touching these without an explicit loader option (e.g.
+    # selectinload) is an error instead of a silent extra query per row. An
+    # AsyncSession can't lazy-load anyway, so this also gives a clearer error.
+    leads = relationship("Lead", back_populates="therapist", lazy="raise")
+    sessions = relationship("Session", back_populates="therapist", lazy="raise")
 
 class Lead(Base):
     __tablename__ = "leads"
+    # Match the per-therapist lookups: newest-first listing and purchased totals.
+    __table_args__ = (
+        Index("ix_leads_therapist_created", "therapist_id", "created_at"),
+        Index("ix_leads_therapist_purchased", "therapist_id", "purchased"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     therapist_id = Column(Integer, ForeignKey("therapists.id"))
-    patient_name = Column(String, nullable=False)
-    issue = Column(String, nullable=True)
+    patient_name = Column(String(120), nullable=False)
+    issue = Column(String(255), nullable=True)
     price = Column(Float, nullable=False, default=0.0)
     purchased = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # default= renders NOW() into the INSERT itself (no Python clock call) and
+    # covers databases whose leads table predates the server default.
+    created_at = Column(
+        DateTime(timezone=True),
+        default=func.now(),
+        server_default=func.now(),
+        nullable=False,
+    )
 
     therapist = relationship("Therapist", back_populates="leads")
 
 class Session(Base):
     __tablename__ = "sessions"
+    # Match the per-therapist lookups: schedule listing and completed totals.
+    __table_args__ = (
+        Index("ix_sessions_therapist_scheduled", "therapist_id", "scheduled_for"),
+        Index("ix_sessions_therapist_status", "therapist_id", "status"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     therapist_id = Column(Integer, ForeignKey("therapists.id"))
-    patient_name = Column(String, nullable=False)
+    patient_name = Column(String(120), nullable=False)
     scheduled_for = Column(DateTime, nullable=False)
-    status = Column(String, default="scheduled")  # scheduled, completed, cancelled
+    status = Column(String(16), default="scheduled")  # scheduled, completed, cancelled
     fee = Column(Float, default=0.0)
     notes_encrypted = Column(Text, nullable=True)
 
@@ -1,11 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 
 class TherapistCreate(BaseModel):
-    full_name: str
-    email: str
-    specialization: Optional[str] = None
+    full_name: str = Field(max_length=120)
+    email: str = Field(max_length=254)
+    specialization: Optional[str] = Field(default=None, max_length=120)
     bio: Optional[str] = None
 
 class TherapistOut(BaseModel):
@@ -15,8 +15,7 @@ class TherapistOut(BaseModel):
     specialization: Optional[str] = None
     bio: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class LeadOut(BaseModel):
     id: int
@@ -26,8 +25,7 @@ class LeadOut(BaseModel):
     purchased: bool
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class SessionOut(BaseModel):
     id: int
@@ -36,11 +34,10 @@ class SessionOut(BaseModel):
     status: str
     fee: float
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class SessionUpdate(BaseModel):
-    status: Optional[str] = None
+    status: Optional[str] = Field(default=None, max_length=16)
     fee: Optional[float] = None
 
 class SessionNotesCreate(BaseModel):
@@ -1,11 +1,51 @@
-from cryptography.fernet import Fernet
+import base64
+import os
+from pathlib import Path
 
-# In a real app, store this securely and don't hardcode it.
-_SECRET_KEY = Fernet.generate_key()
-_fernet = Fernet(_SECRET_KEY)
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# The key must be the same in every worker process, otherwise notes encrypted
+# by one worker can't be decrypted by another. Prefer NOTES_ENCRYPTION_KEY
+# (urlsafe base64 of 32 random bytes) from the environment; for local runs
+# fall back to a key file created on first use.
+_KEY_FILE = Path(
+    os.environ.get(
+        "NOTES_ENCRYPTION_KEY_FILE", Path(__file__).resolve().parent / "secret.key"
+    )
+)
+_NONCE_SIZE = 12
+
+def _load_key() -> bytes:
+    env_key = os.environ.get("NOTES_ENCRYPTION_KEY")
+    if env_key:
+        return base64.urlsafe_b64decode(env_key)
+    if not _KEY_FILE.exists():
+        # Write to a private temp file and hard-link it into place, so
+        # concurrently starting workers agree on whichever key landed first
+        # and never see a half-written file.
+        tmp = _KEY_FILE.with_name(f"{_KEY_FILE.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(base64.urlsafe_b64encode(AESGCM.generate_key(bit_length=256)))
+        try:
+            os.link(tmp, _KEY_FILE)
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink()
+    return base64.urlsafe_b64decode(_KEY_FILE.read_bytes().strip())
+
+_SECRET_KEY = _load_key()
+# AES-GCM encrypts and authenticates in one pass using the CPU's AES
+# instructions. The instance is thread-safe, so one is shared by all calls.
+_aead = AESGCM(_SECRET_KEY)
 
 def encrypt_text(plain: str) -> str:
-    return _fernet.encrypt(plain.encode("utf-8")).decode("utf-8")
+    nonce = os.urandom(_NONCE_SIZE)
+    ciphertext = _aead.encrypt(nonce, plain.encode("utf-8"), None)
+    return base64.b64encode(nonce + ciphertext).decode("ascii")
 
 def decrypt_text(token: str) -> str:
-    return _fernet.decrypt(token.encode("utf-8")).decode("utf-8")
+    data = base64.b64decode(token)
+    nonce, ciphertext = data[:_NONCE_SIZE], data[_NONCE_SIZE:]
+    return _aead.decrypt(nonce, ciphertext, None).decode("utf-8")